@@ -2,20 +2,23 @@
 Chart components for the stock visualization application
 """
 
-from typing import Dict, List, Optional
+from itertools import cycle
+from typing import Dict, Optional, Tuple
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import streamlit as st
 
-from config import CHART_HEIGHT, CHART_COLORS, RANGE_BUTTONS
+from config import CACHE_TTL, CHART_HEIGHT, CHART_COLORS, RANGE_BUTTONS
+from data.processor import DataProcessor
 
 
 class ChartComponents:
     """Handles chart creation and visualization"""
     
     @staticmethod
+    @st.cache_data(ttl=CACHE_TTL, show_spinner=False)
     def create_stock_chart(df: pd.DataFrame, names: Dict[str, str], normalized: bool = False) -> Optional[go.Figure]:
         """
         Create an interactive stock chart with Plotly
@@ -31,34 +34,30 @@ class ChartComponents:
         if df.empty:
             return None
         
-        fig = go.Figure()
-        codes = df['code'].unique()
-        
-        # Use colors from config
-        colors = CHART_COLORS
+        traces = []
+        labels, code_colors = ChartComponents._trace_style(df, names)
         
-        # Add a line for each stock
-        for i, code in enumerate(codes):
-            color = colors[i % len(colors)]
-            code_data = df[df['code'] == code]
-            
-            if not code_data.empty:
-                name = f"{code} · {names.get(code, '')}"
-                fig.add_trace(
-                    go.Scatter(
-                        x=code_data['date'],
-                        y=code_data['close'],
-                        mode='lines',
-                        name=name,
-                        line=dict(color=color, width=2),
-                        hovertemplate=(
-                            "%{x}<br>"
-                            + f"{name}<br>"
-                            + "%{y:.2f}" + (" (指数)" if normalized else "")
-                            + "<extra></extra>"
-                        )
+        # Add a line for each stock (single groupby pass instead of per-code filtering)
+        for code, code_data in df.groupby('code', sort=False, observed=True):
+            name = labels[code]
+            color = code_colors[code]
+            traces.append(
+                go.Scatter(
+                    x=code_data['date'].to_numpy(),
+                    y=code_data['close'].to_numpy(),
+                    mode='lines',
+                    name=name,
+                    line=dict(color=color, width=2),
+                    hovertemplate=(
+                        "%{x}<br>"
+                        + f"{name}<br>"
+                        + "%{y:.2f}" + (" (指数)" if normalized else "")
+                        + "<extra></extra>"
                     )
                 )
+            )
+        
+        fig = go.Figure(data=traces)
         
         # Configure chart layout
         ChartComponents._configure_chart_layout(fig, normalized)
@@ -66,6 +65,7 @@ class ChartComponents:
         return fig
     
     @staticmethod
+    @st.cache_data(ttl=CACHE_TTL, show_spinner=False)
     def create_volume_chart(df: pd.DataFrame, names: Dict[str, str]) -> Optional[go.Figure]:
         """
         Create volume chart
@@ -80,32 +80,29 @@ class ChartComponents:
         if df.empty or 'volume' not in df.columns:
             return None
         
-        fig = go.Figure()
-        codes = df['code'].unique()
-        colors = CHART_COLORS
+        traces = []
+        labels, code_colors = ChartComponents._trace_style(df, names)
         
-        for i, code in enumerate(codes):
-            color = colors[i % len(colors)]
-            code_data = df[df['code'] == code]
-            
-            if not code_data.empty and 'volume' in code_data.columns:
-                name = f"{code} · {names.get(code, '')}"
-                fig.add_trace(
-                    go.Bar(
-                        x=code_data['date'],
-                        y=code_data['volume'],
-                        name=name,
-                        marker_color=color,
-                        opacity=0.7,
-                        hovertemplate=(
-                            "%{x}<br>"
-                            + f"{name}<br>"
-                            + "成交量: %{y:,.0f}"
-                            + "<extra></extra>"
-                        )
+        for code, code_data in df.groupby('code', sort=False, observed=True):
+            name = labels[code]
+            color = code_colors[code]
+            traces.append(
+                go.Bar(
+                    x=code_data['date'].to_numpy(),
+                    y=code_data['volume'].to_numpy(),
+                    name=name,
+                    marker_color=color,
+                    opacity=0.7,
+                    hovertemplate=(
+                        "%{x}<br>"
+                        + f"{name}<br>"
+                        + "成交量: %{y:,.0f}"
+                        + "<extra></extra>"
                     )
                 )
+            )
         
+        fig = go.Figure(data=traces)
         fig.update_layout(
             title="成交量 | Trading Volume",
             xaxis_title="日期 | Date",
@@ -118,6 +115,7 @@ class ChartComponents:
         return fig
     
     @staticmethod
+    @st.cache_data(ttl=CACHE_TTL, show_spinner=False)
     def create_returns_chart(df: pd.DataFrame, names: Dict[str, str]) -> Optional[go.Figure]:
         """
         Create returns chart
@@ -132,32 +130,29 @@ class ChartComponents:
         if df.empty or 'cumulative_return' not in df.columns:
             return None
         
-        fig = go.Figure()
-        codes = df['code'].unique()
-        colors = CHART_COLORS
+        traces = []
+        labels, code_colors = ChartComponents._trace_style(df, names)
         
-        for i, code in enumerate(codes):
-            color = colors[i % len(colors)]
-            code_data = df[df['code'] == code]
-            
-            if not code_data.empty and 'cumulative_return' in code_data.columns:
-                name = f"{code} · {names.get(code, '')}"
-                fig.add_trace(
-                    go.Scatter(
-                        x=code_data['date'],
-                        y=code_data['cumulative_return'] * 100,  # Convert to percentage
-                        mode='lines',
-                        name=name,
-                        line=dict(color=color, width=2),
-                        hovertemplate=(
-                            "%{x}<br>"
-                            + f"{name}<br>"
-                            + "累计收益率: %{y:.2f}%"
-                            + "<extra></extra>"
-                        )
+        for code, code_data in df.groupby('code', sort=False, observed=True):
+            name = labels[code]
+            color = code_colors[code]
+            traces.append(
+                go.Scattergl(
+                    x=code_data['date'].to_numpy(),
+                    y=code_data['cumulative_return'].to_numpy() * 100,  # Convert to percentage
+                    mode='lines',
+                    name=name,
+                    line=dict(color=color, width=2),
+                    hovertemplate=(
+                        "%{x}<br>"
+                        + f"{name}<br>"
+                        + "累计收益率: %{y:.2f}%"
+                        + "<extra></extra>"
                     )
                 )
+            )
         
+        fig = go.Figure(data=traces)
         fig.update_layout(
             title="累计收益率 | Cumulative Returns",
             xaxis_title="日期 | Date",
@@ -182,40 +177,67 @@ class ChartComponents:
         """
         # Create example data
         dates = pd.date_range(start='2023-01-01', end='2023-12-31', freq='B')
-        np.random.seed(42)
+        rng = np.random.default_rng(42)
         
-        example_df = pd.DataFrame()
         example_names = {'600000': '浦发银行', '601288': '农业银行', '000001': '上证指数'}
+        frames = []
         
         for i, (code, name) in enumerate(example_names.items()):
             base = 100 + i * 20
             volatility = 0.01 + i * 0.005
             
-            prices = [base]
-            for _ in range(1, len(dates)):
-                change = np.random.normal(0.0003, volatility)
-                prices.append(prices[-1] * (1 + change))
+            # Simulate the whole price path at once instead of step by step
+            changes = rng.normal(0.0003, volatility, size=len(dates))
+            changes[0] = 0
+            prices = base * np.cumprod(1 + changes)
             
-            df = pd.DataFrame({
+            frames.append(pd.DataFrame({
                 'date': dates,
                 'code': code,
                 'name': name,
                 'close': prices
-            })
-            example_df = pd.concat([example_df, df])
+            }))
+        
+        example_df = pd.concat(frames, ignore_index=True)
         
         # Normalize data
-        for code in example_names.keys():
-            code_data = example_df[example_df['code'] == code]
-            first_price = code_data['close'].iloc[0]
-            example_df.loc[example_df['code'] == code, 'close'] = (
-                example_df.loc[example_df['code'] == code, 'close'] / first_price * 100
-            )
+        example_df['close'] *= 100 / example_df.groupby('code', sort=False)['close'].transform('first')
         
         # Create chart
         fig = ChartComponents.create_stock_chart(example_df, example_names, normalized=True)
         return fig
     
+    @staticmethod
+    def _trace_style(df: pd.DataFrame, names: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Precompute trace labels and colors for each code
+        
+        Args:
+            df: Stock data DataFrame
+            names: Dictionary mapping codes to names
+            
+        Returns:
+            Tuple of (code to label, code to color) dictionaries
+        """
+        codes = df['code'].unique()
+        labels = {code: f"{code} · {names.get(code, '')}" for code in codes}
+        code_colors = dict(zip(codes, cycle(CHART_COLORS)))
+        return labels, code_colors
+    
+    @staticmethod
+    @st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+    def _calculate_returns(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate returns for charting, cached across reruns
+        
+        Args:
+            df: Stock data DataFrame
+            
+        Returns:
+            DataFrame with return columns added
+        """
+        return DataProcessor.calculate_returns(df)
+    
     @staticmethod
     def _configure_chart_layout(fig: go.Figure, normalized: bool = False):
         """
@@ -263,6 +285,15 @@ class ChartComponents:
             st.error("无法显示图表：数据为空 | Cannot display charts: No data available")
             return
         
+        df = DataProcessor.categorize_codes(df)
+        
+        # Calculate returns once up front if not already present
+        if 'cumulative_return' not in df.columns:
+            df = ChartComponents._calculate_returns(df)
+        
+        # Plotly only needs float32 precision, halving the data shipped to the browser
+        df = DataProcessor.downcast_numeric(df)
+        
         # Create tabs
         tab1, tab2, tab3 = st.tabs(["价格走势 | Price Trends", "成交量 | Volume", "收益率 | Returns"])
         
@@ -279,11 +310,6 @@ class ChartComponents:
                 st.info("成交量数据不可用 | Volume data not available")
         
         with tab3:
-            # Calculate returns if not already present
-            if 'cumulative_return' not in df.columns:
-                from data.processor import DataProcessor
-                df = DataProcessor.calculate_returns(df)
-            
             returns_chart = ChartComponents.create_returns_chart(df, names)
             if returns_chart:
                 st.plotly_chart(returns_chart, use_container_width=True)
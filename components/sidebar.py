@@ -6,7 +6,36 @@ import datetime
 from typing import Tuple, Dict
 import streamlit as st
 
-from config import DEFAULT_START_DATE, DEFAULT_END_DATE, MIN_DATE, ADJUST_OPTIONS
+from config import DEFAULT_START_DATE, DEFAULT_END_DATE, MIN_DATE, ADJUST_OPTIONS, MAX_INPUT_LEN
+
+# Static markdown blocks, built once at import
+_INFO_MD = """
+**信息 | Info:**
+* 股票代码: 6位数字，例如 600000 (股票)
+* 基金代码: 6位数字，例如 510300 (ETF基金)
+* 指数代码: 6位数字，例如 000001 (上证指数)
+
+系统会自动检测代码类型并从适当的数据源获取数据。
+System will automatically detect code type and fetch data from appropriate source.
+"""
+
+_EXAMPLES_MD = """
+**热门股票 | Popular Stocks:**
+- 600000 (浦发银行)
+- 000001 (平安银行)
+- 601318 (中国平安)
+- 000002 (万科A)
+
+**主要指数 | Major Indices:**
+- 000001 (上证指数)
+- 399001 (深证成指)
+- 399006 (创业板指)
+
+**热门ETF | Popular ETFs:**
+- 510300 (沪深300ETF)
+- 510500 (中证500ETF)
+- 159919 (沪深300ETF)
+"""
 
 
 class SidebarComponents:
@@ -29,7 +58,8 @@ class SidebarComponents:
         ticker_input = st.sidebar.text_area(
             "输入股票或指数代码，用逗号分隔 | Enter stock or index codes, separated by commas",
             help="例如: 600000,601288,000001,399001 | Example: 600000,601288,000001,399001",
-            placeholder="600000,601288,000001"
+            placeholder="600000,601288,000001",
+            max_chars=MAX_INPUT_LEN
         )
         return ticker_input
     
@@ -93,37 +123,13 @@ class SidebarComponents:
     def render_info_section():
         """Render information section"""
         st.sidebar.markdown("---")
-        st.sidebar.markdown("""
-        **信息 | Info:**
-        * 股票代码: 6位数字，例如 600000 (股票)
-        * 基金代码: 6位数字，例如 510300 (ETF基金)
-        * 指数代码: 6位数字，例如 000001 (上证指数)
-        
-        系统会自动检测代码类型并从适当的数据源获取数据。
-        System will automatically detect code type and fetch data from appropriate source.
-        """)
+        st.sidebar.markdown(_INFO_MD)
     
     @staticmethod
     def render_example_codes():
         """Render example codes section"""
         with st.sidebar.expander("示例代码 | Example Codes"):
-            st.markdown("""
-            **热门股票 | Popular Stocks:**
-            - 600000 (浦发银行)
-            - 000001 (平安银行)
-            - 601318 (中国平安)
-            - 000002 (万科A)
-            
-            **主要指数 | Major Indices:**
-            - 000001 (上证指数)
-            - 399001 (深证成指)
-            - 399006 (创业板指)
-            
-            **热门ETF | Popular ETFs:**
-            - 510300 (沪深300ETF)
-            - 510500 (中证500ETF)
-            - 159919 (沪深300ETF)
-            """)
+            st.markdown(_EXAMPLES_MD)
     
     @staticmethod
     def render_complete_sidebar() -> Dict[str, any]:
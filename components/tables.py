@@ -7,7 +7,8 @@ from typing import Dict, List
 import pandas as pd
 import streamlit as st
 
-from data.processor import DataProcessor
+from config import CACHE_TTL
+from data.processor import ANNUALIZATION_FACTOR, DataProcessor
 from utils.formatters import DataFormatter
 
 
@@ -31,15 +32,36 @@ class TableComponents:
             # Prepare display dataframe
             display_df = DataProcessor.prepare_display_dataframe(df, normalized)
             
-            # Format the dataframe for better display
-            formatted_df = DataFormatter.format_dataframe_for_display(display_df)
-            
-            # Display table
-            st.dataframe(formatted_df, use_container_width=True, height=400)
+            # Display table, letting the frontend format only the visible cells
+            st.dataframe(
+                display_df,
+                use_container_width=True,
+                height=400,
+                column_config=TableComponents._display_column_config(display_df)
+            )
             
             # Download section
             TableComponents._render_download_section(df, display_df)
     
+    @staticmethod
+    def _display_column_config(display_df: pd.DataFrame) -> Dict[str, st.column_config.NumberColumn]:
+        """
+        Build number formats for the display table's numeric columns
+        
+        Args:
+            display_df: Display DataFrame
+            
+        Returns:
+            Dictionary mapping column names to Streamlit column configs
+        """
+        column_config = {}
+        for col in display_df.select_dtypes('number').columns:
+            if 'price' in col.lower() or 'close' in col.lower():
+                column_config[col] = st.column_config.NumberColumn(format="%.2f")
+            elif 'change' in col.lower() and '%' in col:
+                column_config[col] = st.column_config.NumberColumn(format="%.2f%%")
+        return column_config
+    
     @staticmethod
     def render_summary_stats(df: pd.DataFrame):
         """
@@ -73,7 +95,7 @@ class TableComponents:
             st.dataframe(formatted_stats_df, use_container_width=True)
             
             # Download CSV for summary stats
-            csv_stats = stats_df.to_csv(index=True).encode('utf-8')
+            csv_stats = TableComponents._to_csv_bytes(stats_df, index=True)
             st.download_button(
                 label="下载统计摘要CSV | Download Summary Stats CSV",
                 data=csv_stats,
@@ -90,58 +112,57 @@ class TableComponents:
             df: Stock data DataFrame
             names: Dictionary mapping codes to names
         """
-        if df.empty or len(df['code'].unique()) <= 1:
+        if df.empty or df['code'].nunique() <= 1:
             return
         
         with st.expander("股票比较 | Stock Comparison", expanded=False):
-            comparison_data = []
+            # Calculate metrics for comparison in a single groupby pass
+            grouped = df.groupby('code', sort=False, observed=True)['close']
+            metrics = grouped.agg(
+                start_price='first',
+                end_price='last',
+                max_price='max',
+                min_price='min',
+                data_points='size'
+            )
+            total_return = (metrics['end_price'] / metrics['start_price'] - 1) * 100
             
-            for code in df['code'].unique():
-                code_data = df[df['code'] == code].copy()
-                if code_data.empty:
-                    continue
-                
-                # Calculate metrics for comparison
-                start_price = code_data['close'].iloc[0]
-                end_price = code_data['close'].iloc[-1]
-                total_return = ((end_price / start_price) - 1) * 100
-                max_price = code_data['close'].max()
-                min_price = code_data['close'].min()
-                
-                # Calculate volatility if we have enough data
-                volatility = 0
-                if len(code_data) > 1:
-                    daily_returns = code_data['close'].pct_change().dropna()
-                    if len(daily_returns) > 0:
-                        volatility = daily_returns.std() * (252 ** 0.5) * 100
-                
-                comparison_data.append({
-                    '代码 | Code': code,
-                    '名称 | Name': names.get(code, code),
-                    '起始价格 | Start Price': start_price,
-                    '结束价格 | End Price': end_price,
-                    '总收益率 (%) | Total Return (%)': total_return,
-                    '最高价 | Max Price': max_price,
-                    '最低价 | Min Price': min_price,
-                    '年化波动率 (%) | Annual Volatility (%)': volatility,
-                    '数据点数 | Data Points': len(code_data)
-                })
+            # Annualized volatility, left at 0 when there is not enough data
+            return_stats = DataProcessor.daily_return_stats(df).reindex(metrics.index)
+            volatility = (return_stats['std'] * ANNUALIZATION_FACTOR * 100).where(return_stats['count'] > 0, 0)
+            
+            comparison_data = [
+                {
+                    '代码 | Code': row.Index,
+                    '名称 | Name': names.get(row.Index, row.Index),
+                    '起始价格 | Start Price': row.start_price,
+                    '结束价格 | End Price': row.end_price,
+                    '总收益率 (%) | Total Return (%)': total_return[row.Index],
+                    '最高价 | Max Price': row.max_price,
+                    '最低价 | Min Price': row.min_price,
+                    '年化波动率 (%) | Annual Volatility (%)': volatility[row.Index],
+                    '数据点数 | Data Points': row.data_points
+                }
+                for row in metrics.itertuples()
+            ]
             
             if comparison_data:
                 comparison_df = pd.DataFrame(comparison_data)
                 
-                # Format the comparison table
-                formatted_comparison = comparison_df.copy()
-                for col in ['起始价格 | Start Price', '结束价格 | End Price', '最高价 | Max Price', '最低价 | Min Price']:
-                    formatted_comparison[col] = formatted_comparison[col].apply(lambda x: f"¥{x:.2f}")
-                
-                for col in ['总收益率 (%) | Total Return (%)', '年化波动率 (%) | Annual Volatility (%)']:
-                    formatted_comparison[col] = formatted_comparison[col].apply(lambda x: f"{x:.2f}%")
+                # Format the comparison table lazily in the frontend
+                column_config = {
+                    col: st.column_config.NumberColumn(format="¥%.2f")
+                    for col in ['起始价格 | Start Price', '结束价格 | End Price', '最高价 | Max Price', '最低价 | Min Price']
+                }
+                column_config.update({
+                    col: st.column_config.NumberColumn(format="%.2f%%")
+                    for col in ['总收益率 (%) | Total Return (%)', '年化波动率 (%) | Annual Volatility (%)']
+                })
                 
-                st.dataframe(formatted_comparison, use_container_width=True)
+                st.dataframe(comparison_df, use_container_width=True, column_config=column_config)
                 
                 # Download comparison data
-                csv_comparison = comparison_df.to_csv(index=False).encode('utf-8')
+                csv_comparison = TableComponents._to_csv_bytes(comparison_df)
                 st.download_button(
                     label="下载比较数据CSV | Download Comparison CSV",
                     data=csv_comparison,
@@ -149,6 +170,50 @@ class TableComponents:
                     mime="text/csv",
                 )
     
+    @staticmethod
+    @st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+    def _to_csv_bytes(df: pd.DataFrame, index: bool = False) -> bytes:
+        """
+        Serialize DataFrame to UTF-8 CSV bytes, cached across reruns
+        
+        Args:
+            df: DataFrame to serialize
+            index: Whether to include the index
+            
+        Returns:
+            CSV payload for download
+        """
+        return df.to_csv(index=index).encode('utf-8')
+    
+    @staticmethod
+    @st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+    def _to_formatted_csv_bytes(display_df: pd.DataFrame) -> bytes:
+        """
+        Format display columns to strings and serialize them to UTF-8 CSV bytes, cached across reruns
+        
+        Args:
+            display_df: Numeric display DataFrame
+            
+        Returns:
+            Formatted CSV payload for download
+        """
+        formatted_df = DataFormatter.format_dataframe_for_display(display_df)
+        return formatted_df.to_csv(index=False).encode('utf-8')
+    
+    @staticmethod
+    @st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+    def _to_json_bytes(df: pd.DataFrame) -> bytes:
+        """
+        Serialize DataFrame to UTF-8 JSON records bytes, cached across reruns
+        
+        Args:
+            df: DataFrame to serialize
+            
+        Returns:
+            JSON payload for download
+        """
+        return df.to_json(orient='records', date_format='iso').encode('utf-8')
+    
     @staticmethod
     def _render_download_section(df: pd.DataFrame, display_df: pd.DataFrame):
         """
@@ -164,7 +229,7 @@ class TableComponents:
         
         with col1:
             # CSV download for raw data
-            csv_raw = df.to_csv(index=False).encode('utf-8')
+            csv_raw = TableComponents._to_csv_bytes(df)
             filename_raw = DataFormatter.create_download_filename(
                 "stock_data_raw", 
                 df['code'].unique().tolist() if 'code' in df.columns else ['data']
@@ -177,8 +242,8 @@ class TableComponents:
             )
         
         with col2:
-            # CSV download for display data
-            csv_display = display_df.to_csv(index=False).encode('utf-8')
+            # CSV download for display data, formatted to strings inside the cache
+            csv_display = TableComponents._to_formatted_csv_bytes(display_df)
             filename_display = DataFormatter.create_download_filename(
                 "stock_data_formatted",
                 df['code'].unique().tolist() if 'code' in df.columns else ['data']
@@ -192,7 +257,7 @@ class TableComponents:
         
         with col3:
             # JSON download
-            json_data = df.to_json(orient='records', date_format='iso').encode('utf-8')
+            json_data = TableComponents._to_json_bytes(df)
             filename_json = DataFormatter.create_download_filename(
                 "stock_data",
                 df['code'].unique().tolist() if 'code' in df.columns else ['data'],
@@ -216,35 +281,41 @@ class TableComponents:
         if df.empty:
             return
         
+        # Compute all metrics once up front
+        stats = {
+            'n_rows': len(df),
+            'n_codes': df['code'].nunique() if 'code' in df.columns else 0,
+            'date_span': (df['date'].max() - df['date'].min()).days if 'date' in df.columns else None,
+            'n_sources': df['data_source'].nunique() if 'data_source' in df.columns else None,
+        }
+        
         # Create info metrics
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
             st.metric(
                 label="股票数量 | Number of Stocks",
-                value=len(df['code'].unique()) if 'code' in df.columns else 0
+                value=stats['n_codes']
             )
         
         with col2:
             st.metric(
                 label="数据点总数 | Total Data Points",
-                value=len(df)
+                value=stats['n_rows']
             )
         
         with col3:
-            if 'date' in df.columns:
-                date_range = (df['date'].max() - df['date'].min()).days
+            if stats['date_span'] is not None:
                 st.metric(
                     label="时间跨度 (天) | Time Span (Days)",
-                    value=date_range
+                    value=stats['date_span']
                 )
         
         with col4:
-            if 'data_source' in df.columns:
-                sources = df['data_source'].unique()
+            if stats['n_sources'] is not None:
                 st.metric(
                     label="数据源数量 | Data Sources",
-                    value=len(sources)
+                    value=stats['n_sources']
                 )
     
     @staticmethod
@@ -261,6 +332,8 @@ class TableComponents:
             st.warning("没有数据可显示表格 | No data available for tables")
             return
         
+        df = DataProcessor.categorize_codes(df)
+        
         # Data information summary
         TableComponents.render_data_info(df)
         
@@ -271,5 +344,5 @@ class TableComponents:
         TableComponents.render_summary_stats(df)
         
         # Comparison table (only if multiple stocks)
-        if len(df['code'].unique()) > 1:
+        if df['code'].nunique() > 1:
             TableComponents.render_comparison_table(df, names) 
\ No newline at end of file
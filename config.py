@@ -20,11 +20,20 @@ MAX_WIDTH = 1200  # This will be used in CSS styling instead
 DEFAULT_START_DATE = datetime.date(2023, 1, 1)
 DEFAULT_END_DATE = datetime.date.today()
 MIN_DATE = datetime.date(2000, 1, 1)
+MAX_HISTORY = datetime.timedelta(days=365 * 25)  # Earliest start date allowed, relative to today
 
 # Data Configuration
 CACHE_TTL = 3600  # Cache time to live in seconds
 MAX_WORKERS = 10  # Maximum number of concurrent requests
-VALID_CODE_PATTERN = r'^[0-9]{6}$'
+PERSIST_MAX_ENTRIES = 500  # Maximum number of historical results kept in the disk cache
+DATA_SCHEMA_VERSION = 1  # Bump when standardized frames change shape so stale disk entries are skipped
+CODE_LENGTH = 6  # Stock/fund/index codes are exactly this many ASCII digits
+EXCHANGE_SUFFIXES = frozenset({'.SH', '.SZ', '.BJ'})  # Accepted on pasted codes and stripped
+MAX_INPUT_LEN = 64 * 1024  # Longest ticker input accepted, in characters
+TRADING_DAYS = 252  # Trading days per year, used to annualize returns
+SOURCE_DATE_FORMAT = '%Y-%m-%d'  # Date format of akshare history endpoints
+FUND_CODE_PREFIXES = ('1', '5')  # Exchange-traded funds/LOFs; no A-share stock uses these
+INDEX_CODE_PREFIXES = ('399',)  # Shenzhen indices; '000' is shared by SZ stocks and SH indices
 
 # Chart Configuration
 CHART_HEIGHT = 600
@@ -55,6 +64,9 @@ ADJUST_OPTIONS = {
     "不复权 | Not Adjusted": ""
 }
 
+# Adjustment types whose past prices never change (forward adjustment rebases history)
+STABLE_ADJUST_TYPES = ("hfq", "")
+
 # Display Column Mappings
 DISPLAY_COLUMNS = {
     'date': '日期 | Date',
@@ -2,21 +2,43 @@
 Data fetcher module for retrieving stock, fund, and index data
 """
 
-import re
-from concurrent.futures import ThreadPoolExecutor
-from typing import Tuple, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Callable, Tuple, Dict, List, Optional
+import datetime
 import logging
+import threading
+import time
 
 import akshare as ak
 import pandas as pd
+from pandas.api.types import union_categoricals
 import streamlit as st
 
-from config import VALID_CODE_PATTERN, MAX_WORKERS, CACHE_TTL, COLUMN_MAPPINGS
+from config import (MAX_WORKERS, CACHE_TTL, COLUMN_MAPPINGS, SOURCE_DATE_FORMAT, STABLE_ADJUST_TYPES,
+                    FUND_CODE_PREFIXES, INDEX_CODE_PREFIXES, PERSIST_MAX_ENTRIES, DATA_SCHEMA_VERSION)
+from utils.validators import CodeValidator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-code metadata columns, stored as categoricals
+METADATA_COLUMNS = ['code', 'name', 'data_source']
+
+# Serialize first-time downloads of each catalog across fetch worker threads, one lock per catalog
+_CATALOG_LOCKS: Dict[str, threading.Lock] = {"stock": threading.Lock(), "index": threading.Lock()}
+# Monotonic time of each catalog's last failed download, to pause retries for CACHE_TTL
+_CATALOG_FAILURES: Dict[str, float] = {}
+
+
+class _UnpersistedResult(Exception):
+    """Carries a fetched result that must not be written to the disk cache"""
+    
+    def __init__(self, result: Tuple[pd.DataFrame, str]):
+        super().__init__("Result is incomplete and not persisted")
+        self.result = result
+
 
 class StockDataFetcher:
     """Handles fetching stock, fund, and index data from multiple sources"""
@@ -24,8 +46,7 @@ class StockDataFetcher:
     def __init__(self):
         self.error_log: List[str] = []
     
-    @st.cache_data(ttl=CACHE_TTL, show_spinner=False)
-    def fetch_single_stock_data(_self, code: str, start_date: str, end_date: str, adjust: str = "qfq") -> Tuple[pd.DataFrame, str]:
+    def fetch_single_stock_data(self, code: str, start_date: str, end_date: str, adjust: str = "qfq") -> Tuple[pd.DataFrame, str]:
         """
         Fetch data for a single stock/fund/index from multiple sources
         
@@ -38,36 +59,74 @@ class StockDataFetcher:
         Returns:
             Tuple of (DataFrame, stock_name)
         """
-        if not _self._validate_code(code):
+        # Closed ranges with a stable adjustment never change, so they can be kept on disk
+        if end_date < datetime.date.today().strftime("%Y%m%d") and adjust in STABLE_ADJUST_TYPES:
+            try:
+                return self._fetch_persisted_data(code, start_date, end_date, adjust, DATA_SCHEMA_VERSION)
+            except LookupError:
+                return pd.DataFrame(), ""
+            except _UnpersistedResult as e:
+                return e.result
+        
+        return self._fetch_recent_data(code, start_date, end_date, adjust)
+    
+    @st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+    def _fetch_recent_data(_self, code: str, start_date: str, end_date: str, adjust: str) -> Tuple[pd.DataFrame, str]:
+        """Fetch data that may still change, cached in memory for CACHE_TTL"""
+        return _self._fetch_from_sources(code, start_date, end_date, adjust)
+    
+    @st.cache_data(persist="disk", max_entries=PERSIST_MAX_ENTRIES, show_spinner=False)
+    def _fetch_persisted_data(_self, code: str, start_date: str, end_date: str, adjust: str,
+                              schema_version: int) -> Tuple[pd.DataFrame, str]:
+        """Fetch immutable historical data, persisted to disk; schema_version only keys the cache"""
+        df, name = _self._fetch_from_sources(code, start_date, end_date, adjust)
+        # Raising keeps failed lookups out of the persistent cache
+        if df.empty:
+            raise LookupError(f"No data found for {code}")
+        if str(name) == code:
+            # The name lookup fell back to the code; return the data but retry the name next time
+            raise _UnpersistedResult((df, name))
+        return df, name
+    
+    def _fetch_from_sources(self, code: str, start_date: str, end_date: str, adjust: str) -> Tuple[pd.DataFrame, str]:
+        """Try each data source in order and return the first non-empty result"""
+        # Data sources expect the bare code, so drop any exchange suffix such as '.SH'
+        code = CodeValidator.strip_exchange_suffix(code.strip().upper())
+        if not self._validate_code(code):
             logger.warning(f"Invalid code format: {code}")
             return pd.DataFrame(), ""
         
-        _self.error_log.clear()
-        
-        # Try different data sources in order
-        data_sources = [
-            ("stock", _self._fetch_stock_data),
-            ("fund", _self._fetch_fund_data),
-            ("index", _self._fetch_index_data)
-        ]
+        self.error_log.clear()
         
-        for source_type, fetch_func in data_sources:
+        for source_type, fetch_func in self._pick_sources(code):
             try:
                 df, name = fetch_func(code, start_date, end_date, adjust)
                 if not df.empty:
-                    df = _self._standardize_dataframe(df, code, name, source_type)
+                    df = self._standardize_dataframe(df, code, name, source_type)
                     return df, name
             except Exception as e:
                 error_msg = f"{source_type.title()} data source error: {str(e)}"
-                _self.error_log.append(error_msg)
+                self.error_log.append(error_msg)
                 logger.error(error_msg)
         
         # Log all errors if no data found
-        if _self.error_log:
-            logger.error(f"All data sources failed for {code}: {'; '.join(_self.error_log)}")
+        if self.error_log:
+            logger.error(f"All data sources failed for {code}: {'; '.join(self.error_log)}")
         
         return pd.DataFrame(), ""
     
+    def _pick_sources(self, code: str) -> List[Tuple[str, Callable]]:
+        """Order data sources so the one matching the code prefix is tried first"""
+        stock = ("stock", self._fetch_stock_data)
+        fund = ("fund", self._fetch_fund_data)
+        index = ("index", self._fetch_index_data)
+        
+        if code.startswith(FUND_CODE_PREFIXES):
+            return [fund, stock, index]
+        if code.startswith(INDEX_CODE_PREFIXES):
+            return [index, stock, fund]
+        return [stock, fund, index]
+    
     def fetch_multiple_stocks(self, codes: List[str], start_date: str, end_date: str, adjust: str = "qfq") -> Tuple[pd.DataFrame, Dict[str, str]]:
         """
         Fetch data for multiple stocks concurrently
@@ -81,7 +140,7 @@ class StockDataFetcher:
         Returns:
             Tuple of (combined DataFrame, names dictionary)
         """
-        results = []
+        results: List[Optional[pd.DataFrame]] = [None] * len(codes)
         names = {}
         data_sources = {}
         
@@ -92,18 +151,22 @@ class StockDataFetcher:
         
         # Use ThreadPoolExecutor for concurrent requests
         with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(codes))) as executor:
-            future_to_code = {
-                executor.submit(self.fetch_single_stock_data, code, start_date, end_date, adjust): code
-                for code in codes
+            future_to_index = {
+                executor.submit(self.fetch_single_stock_data, code, start_date, end_date, adjust): i
+                for i, code in enumerate(codes)
             }
             
+            # Handle futures as they finish so one slow source doesn't stall progress
             completed = 0
-            for future in future_to_code:
-                code = future_to_code[future]
+            # Refresh the progress widgets about every 5% rather than on every future
+            update_every = max(1, len(codes) // 20)
+            for future in as_completed(future_to_index):
+                index = future_to_index[future]
+                code = codes[index]
                 try:
                     df, name = future.result()
                     if not df.empty:
-                        results.append(df)
+                        results[index] = df
                         names[code] = name
                         if 'data_source' in df.columns:
                             data_sources[code] = df['data_source'].iloc[0]
@@ -115,9 +178,10 @@ class StockDataFetcher:
                 
                 # Update progress
                 completed += 1
-                progress = completed / len(codes)
-                progress_bar.progress(progress)
-                progress_text.text(f"Fetching data: {completed}/{len(codes)} completed")
+                if completed % update_every == 0 or completed == len(codes):
+                    progress = completed / len(codes)
+                    progress_bar.progress(progress)
+                    progress_text.text(f"Fetching data: {completed}/{len(codes)} completed")
         
         # Clear progress indicators
         progress_bar.empty()
@@ -125,18 +189,26 @@ class StockDataFetcher:
         
         # Display data source information
         if data_sources:
-            source_info = ", ".join([f"{code}: {source}" for code, source in data_sources.items()])
+            source_info = ", ".join([f"{code}: {data_sources[code]}" for code in codes if code in data_sources])
             st.info(f"Data sources used: {source_info}")
         
-        if not results:
+        # Slots are in request order so output doesn't depend on completion order
+        frames = [df for df in results if df is not None]
+        if not frames:
             return pd.DataFrame(), {}
         
-        combined_df = pd.concat(results, ignore_index=True)
+        combined_df = pd.concat([frame.drop(columns=METADATA_COLUMNS) for frame in frames], ignore_index=True)
+        
+        # concat would fall back to object dtype for differing categories, so union them directly
+        combined_df = combined_df.assign(**{
+            col: union_categoricals([frame[col] for frame in frames])
+            for col in METADATA_COLUMNS
+        })
         return combined_df, names
     
     def _validate_code(self, code: str) -> bool:
         """Validate stock code format"""
-        return bool(re.match(VALID_CODE_PATTERN, code.strip()))
+        return CodeValidator.validate_stock_code(code)
     
     def _fetch_stock_data(self, code: str, start_date: str, end_date: str, adjust: str) -> Tuple[pd.DataFrame, str]:
         """Fetch stock data from akshare stock API"""
@@ -167,22 +239,34 @@ class StockDataFetcher:
         # Standardize column names
         df = df.rename(columns=COLUMN_MAPPINGS)
         
-        # Convert date to datetime and sort
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
+        # Convert date to datetime with the known format and add categorical metadata in one step
+        df = df.assign(
+            date=pd.to_datetime(df['date'], format=SOURCE_DATE_FORMAT),
+            code=code,
+            # akshare lookups can return non-string names; union_categoricals needs str categories everywhere
+            name=str(name),
+            data_source=source_type,
+        ).astype({col: 'category' for col in METADATA_COLUMNS})
+        
+        # akshare usually returns rows in date order already
+        if not df['date'].is_monotonic_increasing:
+            df = df.sort_values('date', kind='mergesort')
         
-        # Add metadata
-        df['code'] = code
-        df['name'] = name
-        df['data_source'] = source_type
+        # Volume fits a narrower integer type without loss; prices keep float64
+        if 'volume' in df.columns:
+            df = df.assign(volume=pd.to_numeric(df['volume'], downcast='integer'))
         
         return df
     
     def _get_stock_name(self, code: str) -> str:
         """Get stock name from code"""
+        # One cached A-share catalog covers most codes; fall back to a per-code lookup
+        names = self._load_catalog("stock", self._stock_name_table)
+        if code in names:
+            return names[code]
+        
         try:
-            stock_info = ak.stock_individual_info_em(symbol=code)
-            return stock_info.iloc[0, 1] if not stock_info.empty else code
+            return self._lookup_stock_name(code)
         except Exception as e:
             logger.warning(f"Failed to get stock name for {code}: {e}")
             return code
@@ -190,19 +274,69 @@ class StockDataFetcher:
     def _get_fund_name(self, code: str) -> str:
         """Get fund name from code"""
         try:
-            fund_info = ak.fund_individual_basic_info_xq(symbol=code)
-            name_series = fund_info[fund_info['代码'] == code]['名称']
-            return name_series.values[0] if not name_series.empty else code
+            return self._lookup_fund_name(code)
         except Exception as e:
             logger.warning(f"Failed to get fund name for {code}: {e}")
             return code
     
     def _get_index_name(self, code: str) -> str:
         """Get index name from code"""
-        try:
-            index_info = ak.index_stock_info()
-            name_series = index_info[index_info['代码'] == code]['名称']
-            return name_series.values[0] if not name_series.empty else code
-        except Exception as e:
-            logger.warning(f"Failed to get index name for {code}: {e}")
-            return code 
\ No newline at end of file
+        return self._load_catalog("index", self._index_name_table).get(code, code)
+    
+    @staticmethod
+    def _load_catalog(label: str, loader: Callable[[], Dict[str, str]]) -> Dict[str, str]:
+        """
+        Load a cached code/name catalog, returning an empty one if it is unavailable
+        
+        Args:
+            label: Catalog name used for logging and failure tracking
+            loader: lru_cached function that downloads the catalog
+            
+        Returns:
+            Dictionary mapping codes to names, empty after a recent failure
+        """
+        # Once the catalog is cached, lru_cache hits need no lock
+        if loader.cache_info().currsize:
+            return loader()
+        
+        with _CATALOG_LOCKS[label]:
+            failed_at = _CATALOG_FAILURES.get(label)
+            if failed_at is not None and time.monotonic() - failed_at < CACHE_TTL:
+                return {}
+            try:
+                return loader()
+            except Exception as e:
+                _CATALOG_FAILURES[label] = time.monotonic()
+                logger.warning(f"Failed to load {label} name catalog: {e}")
+                return {}
+    
+    # Name lookups are memoized for the process lifetime; failures raise and are not cached
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _lookup_stock_name(code: str) -> str:
+        """Look up stock name from akshare"""
+        stock_info = ak.stock_individual_info_em(symbol=code)
+        return stock_info.iloc[0, 1] if not stock_info.empty else code
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _lookup_fund_name(code: str) -> str:
+        """Look up fund name from akshare"""
+        fund_info = ak.fund_individual_basic_info_xq(symbol=code)
+        name_series = fund_info[fund_info['代码'] == code]['名称']
+        return name_series.values[0] if not name_series.empty else code
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _stock_name_table() -> Dict[str, str]:
+        """Download the A-share code/name catalog once and map codes to names"""
+        stock_info = ak.stock_info_a_code_name()
+        return dict(zip(stock_info['code'], stock_info['name']))
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _index_name_table() -> Dict[str, str]:
+        """Download the index catalog once and map codes to names"""
+        index_info = ak.index_stock_info()
+        return dict(zip(index_info['代码'], index_info['名称']))
@@ -3,13 +3,17 @@ Data processor module for handling data transformations and calculations
 """
 
 from typing import List, Dict
+import numpy as np
 import pandas as pd
 import logging
 
-from config import DISPLAY_COLUMNS
+from config import DISPLAY_COLUMNS, TRADING_DAYS
 
 logger = logging.getLogger(__name__)
 
+# Scales daily standard deviation to an annual figure
+ANNUALIZATION_FACTOR = np.sqrt(TRADING_DAYS)
+
 
 class DataProcessor:
     """Handles data processing operations like normalization and formatting"""
@@ -29,33 +33,62 @@ class DataProcessor:
         if df.empty:
             return df
             
-        normalized_df = df.copy()
-        
-        for code in codes:
-            code_data = normalized_df[normalized_df['code'] == code]
-            if code_data.empty:
-                continue
-                
-            # Get first day price
-            first_day_price = code_data['close'].iloc[0]
-            if first_day_price <= 0:  # Avoid division by zero
-                logger.warning(f"Invalid first day price for {code}: {first_day_price}")
-                continue
-                
-            # Normalize prices for this code
-            mask = normalized_df['code'] == code
-            normalized_df.loc[mask, 'close'] = (
-                normalized_df.loc[mask, 'close'] / first_day_price * 100
-            )
+        # First day price of each code, aligned to every row
+        first_prices = df.drop_duplicates('code').set_index('code')['close']
+        first_price = df['code'].map(first_prices).astype(float)
+        
+        # Avoid division by zero
+        invalid = first_prices[(first_prices <= 0) & first_prices.index.isin(codes)]
+        for code, price in invalid.items():
+            logger.warning(f"Invalid first day price for {code}: {price}")
+        
+        mask = df['code'].isin(codes) & ~(first_price <= 0)
+        
+        # Normalize close, and also high/low/open if they exist, in one pass
+        price_columns = [col for col in ['close', 'high', 'low', 'open'] if col in df.columns]
+        normalized = df[price_columns].div(first_price, axis=0) * 100
+        normalized = normalized.where(mask, df[price_columns], axis=0)
+        
+        return df.assign(**normalized)
+    
+    @staticmethod
+    def categorize_codes(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Store the code column as a categorical for faster grouping and filtering
+        
+        Args:
+            df: Stock data DataFrame
             
-            # Also normalize high and low if they exist
-            for col in ['high', 'low', 'open']:
-                if col in normalized_df.columns:
-                    normalized_df.loc[mask, col] = (
-                        normalized_df.loc[mask, col] / first_day_price * 100
-                    )
-        
-        return normalized_df
+        Returns:
+            DataFrame whose code column has categorical dtype
+        """
+        if 'code' not in df.columns or isinstance(df['code'].dtype, pd.CategoricalDtype):
+            return df
+        
+        return df.assign(code=df['code'].astype('category'))
+    
+    @staticmethod
+    def downcast_numeric(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Downcast price/return columns to float32 and volume to the smallest integer type
+        
+        Args:
+            df: Stock data DataFrame
+            
+        Returns:
+            DataFrame with downcast numeric columns
+        """
+        float_columns = ['open', 'high', 'low', 'close', 'pct_change',
+                         'daily_return', 'cumulative_return', 'volatility_20d']
+        downcast = {
+            col: df[col].astype('float32')
+            for col in float_columns
+            if col in df.columns and df[col].dtype == 'float64'
+        }
+        if 'volume' in df.columns:
+            downcast['volume'] = pd.to_numeric(df['volume'], downcast='integer')
+        
+        return df.assign(**downcast) if downcast else df
     
     @staticmethod
     def prepare_display_dataframe(df: pd.DataFrame, normalized: bool = False) -> pd.DataFrame:
@@ -83,7 +116,7 @@ class DataProcessor:
             
         # Filter to existing columns
         available_columns = [col for col in display_columns if col in df.columns]
-        display_df = df[available_columns].copy()
+        display_df = df[available_columns]
         
         # Create column mapping for renaming
         rename_mapping = {}
@@ -115,31 +148,31 @@ class DataProcessor:
         if df.empty:
             return df
             
-        result_df = df.copy()
+        grouped = df.groupby('code', sort=False, observed=True)
+        group_sizes = grouped.size()
+        if group_sizes.max() < 2:
+            return df
         
         # Calculate daily returns for each stock
-        for code in df['code'].unique():
-            mask = result_df['code'] == code
-            code_data = result_df[mask].copy()
-            
-            if len(code_data) > 1:
-                # Calculate daily returns
-                code_data['daily_return'] = code_data['close'].pct_change()
-                
-                # Calculate cumulative returns
-                code_data['cumulative_return'] = (1 + code_data['daily_return']).cumprod() - 1
-                
-                # Calculate rolling volatility (20-day)
-                if len(code_data) >= 20:
-                    code_data['volatility_20d'] = code_data['daily_return'].rolling(window=20).std() * (252 ** 0.5)
-                
-                # Update the main dataframe
-                result_df.loc[mask, 'daily_return'] = code_data['daily_return']
-                result_df.loc[mask, 'cumulative_return'] = code_data['cumulative_return']
-                if 'volatility_20d' in code_data.columns:
-                    result_df.loc[mask, 'volatility_20d'] = code_data['volatility_20d']
-        
-        return result_df
+        daily_return = grouped['close'].pct_change()
+        
+        # Calculate cumulative returns
+        new_columns = {
+            'daily_return': daily_return,
+            'cumulative_return': (1 + daily_return).groupby(df['code'], sort=False, observed=True).cumprod() - 1,
+        }
+        
+        # Calculate rolling volatility (20-day)
+        if group_sizes.max() >= 20:
+            rolling_std = (
+                daily_return.groupby(df['code'], sort=False, observed=True)
+                .rolling(window=20).std()
+                .reset_index(level=0, drop=True)
+            )
+            new_columns['volatility_20d'] = rolling_std * ANNUALIZATION_FACTOR
+        
+        # Attach all new columns at once
+        return df.assign(**new_columns)
     
     @staticmethod
     def generate_summary_stats(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
@@ -155,34 +188,74 @@ class DataProcessor:
         if df.empty:
             return {}
             
-        summary_stats = {}
-        
-        for code in df['code'].unique():
-            code_data = df[df['code'] == code]
-            if code_data.empty:
-                continue
-                
-            # Calculate basic statistics
-            stats = {
-                'Code': code,
-                'Name': code_data['name'].iloc[0] if 'name' in code_data.columns else code,
-                'Start Date': code_data['date'].min().strftime('%Y-%m-%d'),
-                'End Date': code_data['date'].max().strftime('%Y-%m-%d'),
-                'Start Price': code_data['close'].iloc[0],
-                'End Price': code_data['close'].iloc[-1],
-                'Total Return (%)': ((code_data['close'].iloc[-1] / code_data['close'].iloc[0]) - 1) * 100,
-                'Max Price': code_data['close'].max(),
-                'Min Price': code_data['close'].min(),
-                'Avg Volume': code_data['volume'].mean() if 'volume' in code_data.columns else 0,
-            }
-            
-            # Calculate volatility if we have enough data
-            if len(code_data) > 1:
-                daily_returns = code_data['close'].pct_change().dropna()
-                if len(daily_returns) > 0:
-                    stats['Volatility (Annual %)'] = daily_returns.std() * (252 ** 0.5) * 100
-                    stats['Sharpe Ratio'] = (daily_returns.mean() / daily_returns.std()) * (252 ** 0.5) if daily_returns.std() > 0 else 0
+        grouped = df.groupby('code', sort=False, observed=True)
+        
+        # Calculate basic statistics for all codes in one pass
+        agg = grouped.agg(
+            start_date=('date', 'min'),
+            end_date=('date', 'max'),
+            max_price=('close', 'max'),
+            min_price=('close', 'min'),
+        )
+        first_rows = df.drop_duplicates('code', keep='first').set_index('code')
+        last_rows = df.drop_duplicates('code', keep='last').set_index('code')
+        start_price = first_rows['close'].reindex(agg.index)
+        end_price = last_rows['close'].reindex(agg.index)
+        
+        stats_df = pd.DataFrame({
+            'Code': agg.index.astype(str),
+            'Name': first_rows['name'].reindex(agg.index) if 'name' in df.columns else agg.index.astype(str),
+            'Start Date': agg['start_date'].dt.strftime('%Y-%m-%d'),
+            'End Date': agg['end_date'].dt.strftime('%Y-%m-%d'),
+            'Start Price': start_price,
+            'End Price': end_price,
+            'Total Return (%)': ((end_price / start_price) - 1) * 100,
+            'Max Price': agg['max_price'],
+            'Min Price': agg['min_price'],
+            'Avg Volume': grouped['volume'].mean() if 'volume' in df.columns else 0,
+        }, index=agg.index)
+        
+        # Calculate volatility from per-code daily return statistics
+        return_stats = DataProcessor.daily_return_stats(df).reindex(agg.index)
+        volatility = return_stats['std'] * ANNUALIZATION_FACTOR * 100
+        sharpe = (return_stats['mean'] / return_stats['std'] * ANNUALIZATION_FACTOR).where(return_stats['std'] > 0, 0)
+        
+        summary_stats = stats_df.to_dict(orient='index')
+        for code, stats in summary_stats.items():
+            # Only codes with at least one daily return get volatility figures
+            if return_stats.at[code, 'count'] > 0:
+                stats['Volatility (Annual %)'] = volatility[code]
+                stats['Sharpe Ratio'] = sharpe[code]
+        
+        return summary_stats
+    
+    @staticmethod
+    def daily_return_stats(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute mean, sample std and count of daily returns per code with NumPy
+        
+        Args:
+            df: Stock data DataFrame, rows of each code in date order
             
-            summary_stats[code] = stats
+        Returns:
+            DataFrame with mean, std and count columns indexed by code
+        """
+        group_ids, codes = pd.factorize(df['code'], sort=False)
+        order = np.argsort(group_ids, kind='stable')
+        group_ids = group_ids[order]
+        close = df['close'].to_numpy(dtype=float, na_value=np.nan)[order]
+        
+        # Daily returns between consecutive rows of the same code, skipping NaN like pct_change
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = close[1:] / close[:-1] - 1
+        valid = (group_ids[1:] == group_ids[:-1]) & ~np.isnan(returns)
+        return_ids = group_ids[1:][valid]
+        returns = returns[valid]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            counts = np.bincount(return_ids, minlength=len(codes))
+            means = np.bincount(return_ids, weights=returns, minlength=len(codes)) / counts
+            squared = np.bincount(return_ids, weights=(returns - means[return_ids]) ** 2, minlength=len(codes))
+            std = np.where(counts > 1, np.sqrt(squared / (counts - 1)), np.nan)
         
-        return summary_stats 
\ No newline at end of file
+        return pd.DataFrame({'mean': means, 'std': std, 'count': counts}, index=codes)
\ No newline at end of file
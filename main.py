@@ -8,7 +8,7 @@ Run with: streamlit run main.py
 import streamlit as st
 import pandas as pd
 
-from config import APP_CONFIG, MAX_WIDTH
+from config import APP_CONFIG, MAX_WIDTH, MAX_INPUT_LEN
 from components.sidebar import SidebarComponents
 from components.charts import ChartComponents
 from components.tables import TableComponents
@@ -16,6 +16,57 @@ from data.fetcher import StockDataFetcher
 from data.processor import DataProcessor
 from utils.validators import CodeValidator
 
+# Page CSS, built once at import since MAX_WIDTH is fixed
+_CSS = f"""
+<style>
+    .main {{
+        background-color: #f5f7f9;
+    }}
+    .stApp {{
+        max-width: {MAX_WIDTH}px;
+        margin: 0 auto;
+    }}
+    h1, h2, h3 {{
+        color: #0e1117;
+    }}
+    .sidebar .sidebar-content {{
+        background-color: #f0f2f6;
+    }}
+    .reportview-container .main .block-container {{
+        padding-top: 2rem;
+    }}
+    
+    /* Custom styling for metrics */
+    div[data-testid="metric-container"] {{
+        background-color: white;
+        border: 1px solid #ddd;
+        padding: 1rem;
+        border-radius: 0.5rem;
+        box-shadow: 0 1px 3px rgba(0,0,0,0.12);
+    }}
+    
+    /* Improve table styling */
+    .dataframe {{
+        border: none !important;
+    }}
+    
+    /* Button styling */
+    .stDownloadButton > button {{
+        background-color: #ff6b6b;
+        color: white;
+        border: none;
+        border-radius: 4px;
+        padding: 0.5rem 1rem;
+        font-weight: 500;
+    }}
+    
+    .stDownloadButton > button:hover {{
+        background-color: #ff5252;
+        color: white;
+    }}
+</style>
+"""
+
 
 class StockVisualizationApp:
     """Main application class for the Stock Visualization Tool"""
@@ -29,58 +80,14 @@ class StockVisualizationApp:
     def setup_page(self):
         """Configure Streamlit page settings"""
         st.set_page_config(**APP_CONFIG)
+        
+        # Copy-on-Write is always on from pandas 3; opt in explicitly on pandas 2
+        if int(pd.__version__.split('.')[0]) < 3:
+            pd.set_option('mode.copy_on_write', True)
     
     def setup_styling(self):
         """Apply custom CSS styling"""
-        st.markdown(f"""
-        <style>
-            .main {{
-                background-color: #f5f7f9;
-            }}
-            .stApp {{
-                max-width: {MAX_WIDTH}px;
-                margin: 0 auto;
-            }}
-            h1, h2, h3 {{
-                color: #0e1117;
-            }}
-            .sidebar .sidebar-content {{
-                background-color: #f0f2f6;
-            }}
-            .reportview-container .main .block-container {{
-                padding-top: 2rem;
-            }}
-            
-            /* Custom styling for metrics */
-            div[data-testid="metric-container"] {{
-                background-color: white;
-                border: 1px solid #ddd;
-                padding: 1rem;
-                border-radius: 0.5rem;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.12);
-            }}
-            
-            /* Improve table styling */
-            .dataframe {{
-                border: none !important;
-            }}
-            
-            /* Button styling */
-            .stDownloadButton > button {{
-                background-color: #ff6b6b;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 0.5rem 1rem;
-                font-weight: 500;
-            }}
-            
-            .stDownloadButton > button:hover {{
-                background-color: #ff5252;
-                color: white;
-            }}
-        </style>
-        """, unsafe_allow_html=True)
+        st.markdown(_CSS, unsafe_allow_html=True)
     
     def render_header(self):
         """Render application header"""
@@ -112,8 +119,11 @@ class StockVisualizationApp:
         if not date_valid:
             return [], False, date_error
         
-        # Validate and parse ticker codes
-        valid_tickers, invalid_tickers = CodeValidator.validate_multiple_codes(ticker_input)
+        # Parse, sanitize and validate ticker codes in one pass
+        try:
+            valid_tickers, invalid_tickers = CodeValidator.sanitize_and_validate(ticker_input)
+        except ValueError:
+            return [], False, f"输入过长，最多 {MAX_INPUT_LEN} 个字符 | Input too long, at most {MAX_INPUT_LEN} characters"
         
         if invalid_tickers:
             st.warning(f"无效的代码格式已跳过 | Invalid code formats skipped: {', '.join(invalid_tickers)}")
@@ -121,9 +131,6 @@ class StockVisualizationApp:
         if not valid_tickers:
             return [], False, "没有有效的股票或指数代码 | No valid stock or index codes"
         
-        # Sanitize codes
-        valid_tickers = CodeValidator.sanitize_codes(valid_tickers)
-        
         return valid_tickers, True, ""
     
     def fetch_and_process_data(self, tickers: list, inputs: dict) -> tuple:
@@ -3,7 +3,8 @@ Formatting utilities for data display and export
 """
 
 import datetime
-from typing import Dict, Any
+from typing import Any, Dict, List
+import numpy as np
 import pandas as pd
 
 
@@ -125,7 +126,7 @@ class DataFormatter:
     @staticmethod
     def format_dataframe_for_display(df: pd.DataFrame) -> pd.DataFrame:
         """
-        Format DataFrame columns for better display
+        Format numeric DataFrame columns as strings for the formatted CSV export
         
         Args:
             df: Input DataFrame
@@ -136,18 +137,35 @@ class DataFormatter:
         if df.empty:
             return df
             
-        formatted_df = df.copy()
+        formatted_columns = {}
         
-        # Format numeric columns
-        for col in formatted_df.columns:
+        # Format numeric columns as whole-column array operations
+        for col in df.columns:
+            values = df[col]
+            if not (pd.api.types.is_float_dtype(values) or pd.api.types.is_integer_dtype(values)):
+                continue
+            
             if 'price' in col.lower() or 'close' in col.lower():
-                if formatted_df[col].dtype in ['float64', 'int64']:
-                    formatted_df[col] = formatted_df[col].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "N/A")
+                formatted_columns[col] = DataFormatter._format_numbers(values, "%.2f")
             elif 'volume' in col.lower():
-                if formatted_df[col].dtype in ['float64', 'int64']:
-                    formatted_df[col] = formatted_df[col].apply(DataFormatter.format_volume)
+                formatted_columns[col] = [DataFormatter.format_volume(value) for value in values.tolist()]
             elif 'change' in col.lower() and '%' in col:
-                if formatted_df[col].dtype in ['float64', 'int64']:
-                    formatted_df[col] = formatted_df[col].apply(lambda x: f"{x:.2f}%" if pd.notna(x) else "N/A")
+                formatted_columns[col] = DataFormatter._format_numbers(values, "%.2f%%")
+        
+        # Attach all formatted columns at once
+        return df.assign(**formatted_columns)
+    
+    @staticmethod
+    def _format_numbers(values: pd.Series, fmt: str) -> List[str]:
+        """
+        Format a numeric Series with a printf-style format, using N/A for missing values
         
-        return formatted_df 
\ No newline at end of file
+        Args:
+            values: Numeric Series
+            fmt: printf-style format string
+            
+        Returns:
+            List of formatted strings
+        """
+        arr = values.to_numpy(dtype=float, na_value=np.nan)
+        return [fmt % value if value == value else "N/A" for value in arr.tolist()]
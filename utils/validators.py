@@ -6,7 +6,10 @@ import re
 from typing import List, Tuple
 from datetime import date
 
-from config import VALID_CODE_PATTERN
+from config import CODE_LENGTH, EXCHANGE_SUFFIXES, MAX_HISTORY, MAX_INPUT_LEN
+
+# Codes may be separated by ASCII or full-width commas and any whitespace, including newlines
+_SPLIT_RE = re.compile(r'[,，\s]+')
 
 
 class CodeValidator:
@@ -15,7 +18,7 @@ class CodeValidator:
     @staticmethod
     def validate_stock_code(code: str) -> bool:
         """
-        Validate stock code format
+        Validate stock code format, accepting a known exchange suffix such as '.SH'
         
         Args:
             code: Stock code to validate
@@ -26,37 +29,107 @@ class CodeValidator:
         if not code:
             return False
             
-        code = code.strip()
-        return bool(re.match(VALID_CODE_PATTERN, code))
+        return CodeValidator._validate_stripped(CodeValidator.strip_exchange_suffix(code.strip().upper()))
+    
+    @staticmethod
+    def _validate_stripped(code: str) -> bool:
+        """Validate a code that is already stripped, as produced by the batch splitters"""
+        # Fixed-shape ASCII check; isascii() rules out non-ASCII digits like '１'
+        return len(code) == CODE_LENGTH and code.isascii() and code.isdigit()
+    
+    @staticmethod
+    def strip_exchange_suffix(code: str) -> str:
+        """
+        Drop a known exchange suffix such as '.SH' from an upper-cased code
+        
+        Args:
+            code: Upper-cased stock code, e.g. '600000.SH'
+            
+        Returns:
+            Bare code, e.g. '600000'; unchanged if it has no known suffix
+        """
+        # Frozenset membership on the fixed-position suffix avoids a regex alternation
+        if len(code) == CODE_LENGTH + 3 and code[CODE_LENGTH:] in EXCHANGE_SUFFIXES:
+            return code[:CODE_LENGTH]
+        return code
     
     @staticmethod
     def validate_multiple_codes(codes_input: str) -> Tuple[List[str], List[str]]:
         """
-        Validate multiple stock codes from comma-separated input
+        Validate multiple stock codes from comma- or whitespace-separated input
         
         Args:
-            codes_input: Comma-separated string of codes
+            codes_input: String of codes separated by commas or whitespace
             
         Returns:
-            Tuple of (valid_codes, invalid_codes)
+            Tuple of (valid_codes, invalid_codes), upper-cased with exchange suffixes removed
+            
+        Raises:
+            ValueError: If the input is longer than MAX_INPUT_LEN characters
         """
         if not codes_input:
             return [], []
+        CodeValidator._check_input_length(codes_input)
             
-        # Split and clean codes
-        codes = [code.strip() for code in codes_input.split(',') if code.strip()]
+        # Split on commas and whitespace in one pass; only the ends can yield empty tokens
+        strip_suffix = CodeValidator.strip_exchange_suffix
+        codes = [strip_suffix(code.upper()) for code in _SPLIT_RE.split(codes_input) if code]
         
         valid_codes = []
         invalid_codes = []
         
+        # Bind hot lookups to locals for the loop
+        validate = CodeValidator._validate_stripped
+        add_valid = valid_codes.append
+        add_invalid = invalid_codes.append
         for code in codes:
-            if CodeValidator.validate_stock_code(code):
-                valid_codes.append(code)
-            else:
-                invalid_codes.append(code)
+            (add_valid if validate(code) else add_invalid)(code)
         
         return valid_codes, invalid_codes
     
+    @staticmethod
+    def sanitize_and_validate(codes_input: str) -> Tuple[List[str], List[str]]:
+        """
+        Split, sanitize, deduplicate and validate codes in one pass
+        
+        Args:
+            codes_input: String of codes separated by commas or whitespace
+            
+        Returns:
+            Tuple of (valid_codes, invalid_codes), each unique and in input order
+            
+        Raises:
+            ValueError: If the input is longer than MAX_INPUT_LEN characters
+        """
+        if not codes_input:
+            return [], []
+        CodeValidator._check_input_length(codes_input)
+        
+        valid_codes = []
+        invalid_codes = []
+        seen = set()
+        
+        # Bind hot lookups to locals for the loop
+        validate = CodeValidator._validate_stripped
+        add_seen = seen.add
+        add_valid = valid_codes.append
+        add_invalid = invalid_codes.append
+        strip_suffix = CodeValidator.strip_exchange_suffix
+        for token in _SPLIT_RE.split(codes_input):
+            code = strip_suffix(token.upper())
+            if not code or code in seen:
+                continue
+            add_seen(code)
+            (add_valid if validate(code) else add_invalid)(code)
+        
+        return valid_codes, invalid_codes
+    
+    @staticmethod
+    def _check_input_length(codes_input: str) -> None:
+        """Reject oversized input before it is split, bounding work and memory"""
+        if len(codes_input) > MAX_INPUT_LEN:
+            raise ValueError(f"Code input is too long ({len(codes_input)} > {MAX_INPUT_LEN} characters)")
+    
     @staticmethod
     def validate_date_range(start_date: date, end_date: date) -> Tuple[bool, str]:
         """
@@ -72,12 +145,12 @@ class CodeValidator:
         if start_date > end_date:
             return False, "Start date must be before end date"
         
-        if end_date > date.today():
+        today = date.today()
+        if end_date > today:
             return False, "End date cannot be in the future"
         
         # Check if date range is reasonable (not too far back)
-        from datetime import timedelta
-        max_history = date.today() - timedelta(days=365 * 25)  # 25 years
+        max_history = today - MAX_HISTORY
         if start_date < max_history:
             return False, f"Start date cannot be earlier than {max_history.strftime('%Y-%m-%d')}"
         
@@ -94,13 +167,9 @@ class CodeValidator:
         Returns:
             List of sanitized unique codes
         """
-        sanitized = []
-        seen = set()
-        
-        for code in codes:
-            clean_code = code.strip().upper()
-            if clean_code and clean_code not in seen:
-                sanitized.append(clean_code)
-                seen.add(clean_code)
+        # dict keeps first-seen order, so fromkeys deduplicates in a single C-level pass
+        cleaned = map(CodeValidator.strip_exchange_suffix, map(str.upper, map(str.strip, codes)))
+        sanitized = dict.fromkeys(cleaned)
+        sanitized.pop('', None)
         
-        return sanitized 
\ No newline at end of file
+        return list(sanitized) 
\ No newline at end of file